@@ -8,17 +8,26 @@ This file contains the complete UI:
 - Transcript upload
 """
 
-import io
+import hmac
+import json
+import traceback
+from datetime import datetime
 import streamlit as st
-from PIL import Image
 from config import (
     COUNTRIES,
     RETAILERS,
     STORE_FORMATS,
     SHELF_LOCATIONS,
     CURRENCIES,
-    PHOTO_TYPES
+    PHOTO_TYPES,
+    EXCHANGE_RATES,
+    PRICING,
+    TRANSCRIPT_MAX_BYTES
 )
+# Lightweight project modules (pure Python, no third-party imports) load up
+# front; modules that pull in Pillow, openpyxl or the anthropic SDK stay lazy
+from modules.prompt_builder import build_prompt
+from prompts.shelf_analysis import SYSTEM_PROMPT
 
 # ==============================================================================
 # PAGE CONFIGURATION
@@ -83,8 +92,12 @@ if not st.session_state["authenticated"]:
         
         # Login button
         if st.button("Login", type="primary", use_container_width=True):
-            # Check password against secrets
-            if password_input == st.secrets["app_password"]:
+            # Check password against secrets (constant-time compare; encoded
+            # because compare_digest only accepts ASCII str)
+            if hmac.compare_digest(
+                password_input.encode("utf-8"),
+                st.secrets["app_password"].encode("utf-8")
+            ):
                 st.session_state["authenticated"] = True
                 st.rerun()
             else:
@@ -205,42 +218,99 @@ uploaded_photos = st.file_uploader(
 # SECTION 2 — PHOTO TAGGING
 # ==============================================================================
 
-# If photos are uploaded, display each with tagging controls
-if uploaded_photos:
-    st.write("")  # Add spacing
+
+def rotate_photo_by(rotation_key: str, degrees: int) -> None:
+    """Button callback: add `degrees` to a photo's rotation angle (mod 360)."""
+    st.session_state[rotation_key] = (st.session_state[rotation_key] + degrees) % 360
+
+
+def get_rotated_photos(uploaded_photos: list) -> list[tuple[bytes, bytes]]:
+    """
+    Return (preview_bytes, rotated_bytes) for each uploaded photo, in order.
+    
+    Results are cached in session state so reruns only process new photos
+    or photos whose rotation changed.
+    """
+    # Imported lazily (pulls in Pillow) so the login screen and form load fast
+    from modules.image_processor import rotate_photos
+    
+    # Make sure every photo has a rotation angle in session state
+    for i in range(len(uploaded_photos)):
+        if f"rotation_{i}" not in st.session_state:
+            st.session_state[f"rotation_{i}"] = 0
     
+    # Rotated photos are cached across reruns, keyed by (file_id, angle), so
+    # changing a dropdown doesn't re-encode every photo. file_id is unique per
+    # upload, unlike (name, size): two different IMG_0001.JPG files of the
+    # same size must not share an entry.
+    photo_cache = st.session_state.get("rotated_photo_cache", {})
+    cache_keys = [
+        (photo.file_id, st.session_state[f"rotation_{i}"])
+        for i, photo in enumerate(uploaded_photos)
+    ]
+    
+    # Decode/rotate/encode only new or re-rotated photos, in parallel,
+    # before drawing any widgets
+    missing = {key: i for i, key in enumerate(cache_keys) if key not in photo_cache}
+    new_results = rotate_photos([
+        (uploaded_photos[i], key[1]) for key, i in missing.items()
+    ])
+    photo_cache.update(zip(missing.keys(), new_results))
+    
+    # Keep only the current photos/angles so memory stays bounded
+    st.session_state["rotated_photo_cache"] = {key: photo_cache[key] for key in cache_keys}
+    return [photo_cache[key] for key in cache_keys]
+
+
+@st.fragment
+def render_photo_tagging(uploaded_photos: list) -> None:
+    """
+    Show each uploaded photo with rotate buttons and type/group inputs,
+    and store the resulting tags in st.session_state["photo_tags"].
+    
+    Runs as a fragment: clicking rotate or changing a photo's type/group only
+    reruns this function, not the metadata form, uploaders and results below.
+    The exception is the debug Prompt Preview, which is built from the photo
+    tags: while it is shown, a change to the tags triggers a full-app rerun.
+    """
     # Store photo tags in session state
-    # Each photo gets: filename, type (Overview/Close-up), group number, and file data
+    # Each photo gets: filename, type (Overview/Close-up), group number, file data
+    # and the original upload size (for the "Image Payload" savings metric)
     photo_tags = []
+    rotated_photos = get_rotated_photos(uploaded_photos)
     
     for i, photo in enumerate(uploaded_photos):
         rot_key = f"rotation_{i}"
-        if rot_key not in st.session_state:
-            st.session_state[rot_key] = 0
+        preview_bytes, rotated_bytes = rotated_photos[i]
 
-        img = Image.open(io.BytesIO(photo.getvalue()))
-        angle = st.session_state[rot_key]
-        if angle != 0:
-            img = img.rotate(-angle, expand=True)
-
-        col1, col2, col3 = st.columns([1, 2, 2])
+        # One flat row per photo (nested st.columns add layout overhead on
+        # every rerun): preview | rotate CCW | rotate CW | type | group
+        col_img, col_ccw, col_cw, col_type, col_group = st.columns([2, 1, 1, 4, 4])
+        
+        with col_img:
+            st.image(preview_bytes, width=150)
         
-        with col1:
-            preview_buf = io.BytesIO()
-            img.convert("RGB").save(preview_buf, format="JPEG")
-            st.image(preview_buf.getvalue(), width=150)
-
-            b1, b2 = st.columns(2)
-            with b1:
-                if st.button("\u21BA", key=f"rot_ccw_{i}", help="Rotate counter-clockwise"):
-                    st.session_state[rot_key] = (st.session_state[rot_key] - 90) % 360
-                    st.rerun()
-            with b2:
-                if st.button("\u21BB", key=f"rot_cw_{i}", help="Rotate clockwise"):
-                    st.session_state[rot_key] = (st.session_state[rot_key] + 90) % 360
-                    st.rerun()
+        # on_click callbacks update the angle before the click's own rerun,
+        # so one click = one rerun (st.rerun() inside the `if` caused a second)
+        with col_ccw:
+            st.button(
+                "\u21BA",
+                key=f"rot_ccw_{i}",
+                help="Rotate counter-clockwise",
+                on_click=rotate_photo_by,
+                args=(rot_key, -90)
+            )
+        
+        with col_cw:
+            st.button(
+                "\u21BB",
+                key=f"rot_cw_{i}",
+                help="Rotate clockwise",
+                on_click=rotate_photo_by,
+                args=(rot_key, 90)
+            )
         
-        with col2:
+        with col_type:
             photo_type = st.selectbox(
                 "Photo Type",
                 options=PHOTO_TYPES,
@@ -248,7 +318,7 @@ if uploaded_photos:
                 label_visibility="visible" if i == 0 else "collapsed"
             )
         
-        with col3:
+        with col_group:
             group_number = st.number_input(
                 "Group",
                 min_value=1,
@@ -258,17 +328,29 @@ if uploaded_photos:
                 label_visibility="visible" if i == 0 else "collapsed"
             )
         
-        rotated_buf = io.BytesIO()
-        img.convert("RGB").save(rotated_buf, format="JPEG", quality=95)
         photo_tags.append({
             "filename": photo.name,
             "type": photo_type,
             "group": group_number,
-            "data": rotated_buf.getvalue()
+            "data": rotated_bytes,
+            "upload_size": photo.size
         })
     
-    # Update session state with all photo tags
+    # Update session state with all photo tags. Unchanged photo bytes are the
+    # same cached objects, so this comparison doesn't compare image data.
+    tags_changed = photo_tags != st.session_state.get("photo_tags")
     st.session_state["photo_tags"] = photo_tags
+    
+    # A fragment rerun doesn't redraw the rest of the page, so refresh the
+    # whole app when the open Prompt Preview would otherwise show stale tags
+    if tags_changed and st.session_state.get("show_debug"):
+        st.rerun(scope="app")
+
+
+# If photos are uploaded, display each with tagging controls
+if uploaded_photos:
+    st.write("")  # Add spacing
+    render_photo_tagging(uploaded_photos)
 
 # ==============================================================================
 # SECTION 3 — TRANSCRIPT UPLOAD
@@ -286,10 +368,32 @@ uploaded_transcript = st.file_uploader(
 
 # If transcript is uploaded, read and store its content
 if uploaded_transcript:
-    transcript_text = uploaded_transcript.read().decode("utf-8")
-    st.session_state["transcript_text"] = transcript_text
-    st.success(f"Transcript loaded: {len(transcript_text)} characters")
+    # The uploader returns the same file on every rerun, so only decode it
+    # when a new file is uploaded (file_id is unique per upload, so an edited
+    # transcript of the same name and size is still picked up)
+    transcript_key = uploaded_transcript.file_id
+    if st.session_state.get("transcript_key") != transcript_key:
+        st.session_state["transcript_key"] = transcript_key
+        if uploaded_transcript.size > TRANSCRIPT_MAX_BYTES:
+            st.session_state["transcript_text"] = None
+        else:
+            # errors="replace" so a stray non-UTF-8 byte doesn't crash the page
+            st.session_state["transcript_text"] = (
+                uploaded_transcript.getvalue().decode("utf-8", errors="replace")
+            )
+    
+    transcript_text = st.session_state["transcript_text"]
+    if transcript_text is None:
+        # Not blocking: the analysis can still run, just without the transcript
+        st.warning(
+            f"Transcript is too large ({uploaded_transcript.size // 1000:,} KB; "
+            f"maximum is {TRANSCRIPT_MAX_BYTES // 1000:,} KB) and will be ignored. "
+            f"Upload a smaller file to include it in the analysis."
+        )
+    else:
+        st.success(f"Transcript loaded: {len(transcript_text)} characters")
 else:
+    st.session_state["transcript_key"] = None
     st.session_state["transcript_text"] = None
 
 # ==============================================================================
@@ -356,6 +460,33 @@ def validate_metadata() -> tuple[bool, list[str]]:
     return len(missing_fields) == 0, missing_fields
 
 
+def build_metadata() -> dict:
+    """
+    Build the store metadata dictionary from session state.
+    
+    Resolves each "Other" dropdown choice to its free-text value. Shared by
+    the prompt, the Excel export and the debug preview so they always agree.
+    
+    Returns:
+        Dictionary with country, city, retailer, store_format, store_name,
+        shelf_location, currency and exchange_rate
+    """
+    def resolve(key: str) -> str:
+        value = st.session_state[key]
+        return st.session_state[f"{key}_other"] if value == "Other" else value
+    
+    return {
+        "country": st.session_state["country"],
+        "city": st.session_state["city"],
+        "retailer": resolve("retailer"),
+        "store_format": resolve("store_format"),
+        "store_name": st.session_state["store_name"],
+        "shelf_location": resolve("shelf_location"),
+        "currency": st.session_state["currency"],
+        "exchange_rate": EXCHANGE_RATES["GBP_TO_EUR"]
+    }
+
+
 # Analyze button
 if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
     # Validate metadata before proceeding
@@ -365,12 +496,12 @@ if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
         st.warning(f"Please fill in the following required fields: {', '.join(missing_fields)}")
     else:
         # Import required modules
-        from modules.prompt_builder import build_prompt
-        from modules.claude_client import analyze_shelf
-        from prompts.shelf_analysis import SYSTEM_PROMPT
-        from config import EXCHANGE_RATES, PRICING
+        from modules.claude_client import (
+            analyze_shelf,
+            build_request_key,
+            RequestTooLargeError
+        )
         import anthropic
-        import json
         
         # Show progress status with detailed steps
         with st.status("Analyzing shelf photos...", expanded=True) as status:
@@ -380,47 +511,12 @@ if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
                 st.write(f"Step 1: Preparing {num_photos} photos for analysis...")
                 
                 # Build metadata dictionary
-                final_retailer = (
-                    st.session_state["retailer_other"] 
-                    if st.session_state["retailer"] == "Other" 
-                    else st.session_state["retailer"]
-                )
-                final_store_format = (
-                    st.session_state["store_format_other"] 
-                    if st.session_state["store_format"] == "Other" 
-                    else st.session_state["store_format"]
-                )
-                final_shelf_location = (
-                    st.session_state["shelf_location_other"] 
-                    if st.session_state["shelf_location"] == "Other" 
-                    else st.session_state["shelf_location"]
-                )
-                
-                metadata = {
-                    "country": st.session_state["country"],
-                    "city": st.session_state["city"],
-                    "retailer": final_retailer,
-                    "store_format": final_store_format,
-                    "store_name": st.session_state["store_name"],
-                    "shelf_location": final_shelf_location,
-                    "currency": st.session_state["currency"],
-                    "exchange_rate": EXCHANGE_RATES["GBP_TO_EUR"]
-                }
-                
-                # Get photo tags (without 'data' for prompt building)
-                photo_tags_for_prompt = [
-                    {
-                        "filename": tag["filename"],
-                        "type": tag["type"],
-                        "group": tag["group"]
-                    }
-                    for tag in st.session_state["photo_tags"]
-                ]
+                metadata = build_metadata()
                 
                 # Build the complete prompt
                 user_prompt = build_prompt(
                     metadata=metadata,
-                    photo_tags=photo_tags_for_prompt,
+                    photo_tags=st.session_state["photo_tags"],
                     transcript_text=st.session_state["transcript_text"]
                 )
                 
@@ -430,12 +526,25 @@ if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
                 # Step 2: Send to Claude
                 st.write("Step 2: Sending to Claude Extended Thinking... (this may take 1-3 minutes)")
                 
-                # Call Claude API (streaming)
-                result = analyze_shelf(
-                    system_prompt=SYSTEM_PROMPT,
-                    user_prompt=user_prompt,
-                    photos=st.session_state["photo_tags"]
+                # Reuse the previous result if nothing changed since the last run
+                # (protects against double-clicks costing another API call)
+                request_key = build_request_key(
+                    SYSTEM_PROMPT, user_prompt, st.session_state["photo_tags"]
                 )
+                cached_run = st.session_state.get("last_api_run")
+                
+                reused = cached_run is not None and cached_run["key"] == request_key
+                if reused:
+                    st.write("Inputs unchanged since the last run — reusing previous result.")
+                    result = cached_run["result"]
+                else:
+                    # Call Claude API (streaming)
+                    result = analyze_shelf(
+                        system_prompt=SYSTEM_PROMPT,
+                        user_prompt=user_prompt,
+                        photos=st.session_state["photo_tags"]
+                    )
+                    st.session_state["last_api_run"] = {"key": request_key, "result": result}
                 
                 # Step 3: Parse response
                 st.write("Step 3: Parsing response...")
@@ -456,6 +565,19 @@ if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
                     st.session_state["analysis_elapsed"] = result["elapsed_seconds"]
                     st.session_state["analysis_image_savings"] = result["image_savings"]
                     st.session_state["raw_response"] = result.get("raw_response", "")
+                    # Reused results keep the original run's usage, but no new
+                    # call was paid for; the metrics below say so
+                    st.session_state["analysis_reused"] = reused
+                    
+                    # Summary stats are a pure function of the SKUs, so compute
+                    # them once here instead of on every rerun of the results section.
+                    # Normalize each brand once; `or ""` also covers brands returned as null
+                    brand_names = {(sku.get("brand") or "").strip() for sku in skus}
+                    brand_names.discard("")
+                    st.session_state["analysis_unique_brands"] = len(brand_names)
+                    
+                    # New results invalidate any previously generated Excel file
+                    st.session_state["excel_cache"] = None
                     
                     # Update status to complete
                     status.update(label=f"Analysis complete! Found {len(skus)} SKUs.", state="complete", expanded=False)
@@ -472,6 +594,10 @@ if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
                 status.update(label="Connection failed", state="error", expanded=False)
                 st.error("Network error. Check your internet connection.")
             
+            except RequestTooLargeError as e:
+                status.update(label="Too many photos", state="error", expanded=False)
+                st.error(str(e))
+            
             except json.JSONDecodeError as e:
                 status.update(label="Invalid JSON response", state="error", expanded=False)
                 st.error("Claude returned invalid JSON. See details below.")
@@ -486,7 +612,6 @@ if st.button("Analyze Shelf", disabled=not can_analyze, type="primary"):
                 st.error(f"Unexpected error ({error_type}): {str(e)}")
                 
                 # Show traceback in expander for debugging
-                import traceback
                 with st.expander("Error Details", expanded=False):
                     st.code(traceback.format_exc(), language="text")
 
@@ -498,23 +623,29 @@ if "analysis_result" in st.session_state and st.session_state["analysis_result"]
     # Calculate summary statistics
     skus = st.session_state['analysis_result']
     num_skus = len(skus)
-    unique_brands = len(set(sku.get("brand", "").strip() for sku in skus if sku.get("brand", "").strip()))
+    unique_brands = st.session_state["analysis_unique_brands"]
     
     st.write(f"**Found {num_skus} SKUs across {unique_brands} unique brands**")
     
     # Show usage metrics if available
     if "analysis_usage" in st.session_state:
-        from config import PRICING
-        
         usage = st.session_state["analysis_usage"]
         elapsed = st.session_state.get("analysis_elapsed", 0)
         savings = st.session_state.get("analysis_image_savings", {})
         
-        input_tok = usage["input_tokens"]
+        # Prompt-cache tokens are reported (and priced) separately from
+        # input_tokens; .get() also handles results stored without these keys
+        cache_write_tok = usage.get("cache_creation_input_tokens", 0)
+        cache_read_tok = usage.get("cache_read_input_tokens", 0)
+        input_tok = usage["input_tokens"] + cache_write_tok + cache_read_tok
         output_tok = usage["output_tokens"]
         total_tok = input_tok + output_tok
         
-        input_cost = input_tok * PRICING["input_per_million"] / 1_000_000
+        input_cost = (
+            usage["input_tokens"] * PRICING["input_per_million"]
+            + cache_write_tok * PRICING["cache_write_per_million"]
+            + cache_read_tok * PRICING["cache_read_per_million"]
+        ) / 1_000_000
         output_cost = output_tok * PRICING["output_per_million"] / 1_000_000
         total_cost = input_cost + output_cost
         
@@ -522,18 +653,31 @@ if "analysis_result" in st.session_state and st.session_state["analysis_result"]
         col_m1.metric("Total Tokens", f"{total_tok:,}")
         col_m2.metric("Input Tokens", f"{input_tok:,}")
         col_m3.metric("Output Tokens", f"{output_tok:,}")
-        col_m4.metric("Estimated Cost", f"${total_cost:.2f}")
         
-        col_t1, col_t2 = st.columns(2)
-        col_t1.metric("Processing Time", f"{elapsed:.1f}s")
+        # A reused result made no API call: token counts are from the original
+        # run, but this run cost nothing and took no API time
+        reused = st.session_state.get("analysis_reused", False)
+        if reused:
+            col_m4.metric("Estimated Cost", "$0.00 (reused)")
+        else:
+            col_m4.metric("Estimated Cost", f"${total_cost:.2f}")
+        
+        col_t1, col_t2, col_t3 = st.columns(3)
+        col_t1.metric("Processing Time", "reused" if reused else f"{elapsed:.1f}s")
         if savings.get("original_bytes", 0) > 0:
             orig_mb = savings["original_bytes"] / (1024 * 1024)
             proc_mb = savings["processed_bytes"] / (1024 * 1024)
             col_t2.metric("Image Payload", f"{proc_mb:.1f} MB", delta=f"-{orig_mb - proc_mb:.1f} MB")
+        col_t3.metric("Cached Input Tokens", f"{cache_read_tok:,}")
+        
+        if reused:
+            st.caption(
+                "Inputs were unchanged, so the previous result was reused and no new "
+                "API call was made. Token counts are from the original run."
+            )
     
     # Show a preview of the first few SKUs
     with st.expander("Preview first 3 SKUs"):
-        import json
         preview_data = st.session_state['analysis_result'][:3]
         st.json(preview_data)
     
@@ -542,41 +686,23 @@ if "analysis_result" in st.session_state and st.session_state["analysis_result"]
     # ==============================================================================
     
     from modules.excel_generator import generate_excel
-    from datetime import datetime
     
     # Build metadata dictionary for Excel generation
-    final_retailer = (
-        st.session_state["retailer_other"] 
-        if st.session_state["retailer"] == "Other" 
-        else st.session_state["retailer"]
-    )
-    final_store_format = (
-        st.session_state["store_format_other"] 
-        if st.session_state["store_format"] == "Other" 
-        else st.session_state["store_format"]
-    )
-    final_shelf_location = (
-        st.session_state["shelf_location_other"] 
-        if st.session_state["shelf_location"] == "Other" 
-        else st.session_state["shelf_location"]
-    )
-    
-    metadata_dict = {
-        "country": st.session_state["country"],
-        "city": st.session_state["city"],
-        "retailer": final_retailer,
-        "store_format": final_store_format,
-        "store_name": st.session_state["store_name"],
-        "shelf_location": final_shelf_location,
-        "currency": st.session_state["currency"]
-    }
+    metadata_dict = build_metadata()
     
-    # Generate Excel file
-    excel_bytes = generate_excel(st.session_state["analysis_result"], metadata_dict)
+    # Generate the Excel file once per analysis + metadata combination.
+    # Without this cache every rerun (any widget click) rebuilt the whole .xlsx.
+    excel_cache_key = tuple(metadata_dict.items())
+    excel_cache = st.session_state.get("excel_cache")
+    if excel_cache is not None and excel_cache["key"] == excel_cache_key:
+        excel_bytes = excel_cache["bytes"]
+    else:
+        excel_bytes = generate_excel(st.session_state["analysis_result"], metadata_dict)
+        st.session_state["excel_cache"] = {"key": excel_cache_key, "bytes": excel_bytes}
     
     # Build filename: {Retailer}_{City}_{YYYY-MM-DD}.xlsx
     # Replace spaces with underscores in retailer and city
-    retailer_clean = final_retailer.replace(" ", "_")
+    retailer_clean = metadata_dict["retailer"].replace(" ", "_")
     city_clean = st.session_state["city"].replace(" ", "_")
     today_date = datetime.now().strftime("%Y-%m-%d")
     filename = f"{retailer_clean}_{city_clean}_{today_date}.xlsx"
@@ -595,62 +721,29 @@ if "analysis_result" in st.session_state and st.session_state["analysis_result"]
 # ==============================================================================
 
 if uploaded_photos or "analysis_result" in st.session_state:
-    show_debug = st.checkbox("Show debug info", value=False)
+    show_debug = st.checkbox("Show debug info", value=False, key="show_debug")
     
     if show_debug:
         # Prompt Preview
         if uploaded_photos:
             with st.expander("Prompt Preview", expanded=True):
-                from modules.prompt_builder import build_prompt
-                from config import EXCHANGE_RATES
-                
                 # Build metadata dictionary from session state
-                final_retailer = (
-                    st.session_state["retailer_other"] 
-                    if st.session_state["retailer"] == "Other" 
-                    else st.session_state["retailer"]
-                )
-                final_store_format = (
-                    st.session_state["store_format_other"] 
-                    if st.session_state["store_format"] == "Other" 
-                    else st.session_state["store_format"]
-                )
-                final_shelf_location = (
-                    st.session_state["shelf_location_other"] 
-                    if st.session_state["shelf_location"] == "Other" 
-                    else st.session_state["shelf_location"]
-                )
-                
-                metadata = {
-                    "country": st.session_state["country"],
-                    "city": st.session_state["city"],
-                    "retailer": final_retailer,
-                    "store_format": final_store_format,
-                    "store_name": st.session_state["store_name"],
-                    "shelf_location": final_shelf_location,
-                    "currency": st.session_state["currency"],
-                    "exchange_rate": EXCHANGE_RATES["GBP_TO_EUR"]
-                }
-                
-                # Get photo tags from session state (without the 'data' field for preview)
-                photo_tags_preview = [
-                    {
-                        "filename": tag["filename"],
-                        "type": tag["type"],
-                        "group": tag["group"]
-                    }
-                    for tag in st.session_state["photo_tags"]
-                ]
+                metadata = build_metadata()
                 
                 # Build the complete prompt
                 complete_prompt = build_prompt(
                     metadata=metadata,
-                    photo_tags=photo_tags_preview,
+                    photo_tags=st.session_state["photo_tags"],
                     transcript_text=st.session_state["transcript_text"]
                 )
                 
                 # Display the prompt in a code block for readability
                 st.code(complete_prompt, language="text")
+            
+            # The static instructions are sent as the system prompt, not as
+            # part of the per-analysis prompt above
+            with st.expander("System Prompt (analysis instructions)", expanded=False):
+                st.code(SYSTEM_PROMPT, language="text")
         
         # Raw JSON Response
         if "raw_response" in st.session_state and st.session_state["raw_response"]:
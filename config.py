@@ -95,6 +95,14 @@ EXCHANGE_RATES = {
 # Photo type options for tagging uploaded images
 PHOTO_TYPES = ["Overview", "Close-up"]
 
+# ==============================================================================
+# TRANSCRIPT UPLOAD
+# ==============================================================================
+
+# Largest transcript file accepted (bytes). Voice transcripts are a few KB;
+# anything far bigger is almost certainly the wrong file and would bloat the prompt.
+TRANSCRIPT_MAX_BYTES = 200_000
+
 # ==============================================================================
 # IMAGE PROCESSING CONFIGURATION
 # ==============================================================================
@@ -102,7 +110,16 @@ PHOTO_TYPES = ["Overview", "Close-up"]
 # Settings for resizing/compressing photos before sending to Claude
 IMAGE_CONFIG = {
     "max_dimension": 1568,  # Claude's max processing resolution (px, longest side)
+    "overview_max_dimension": 1568,  # Overview limit; lower only after checking facings/dedup accuracy
     "jpeg_quality": 85,     # JPEG compression quality (0-100)
+    "preview_max_dimension": 300,  # UI thumbnail size (shown at 150px; 2x for sharp screens)
+    "preview_jpeg_quality": 80,    # UI thumbnail JPEG quality
+    "optimize_jpeg": False, # Extra Huffman pass: ~2-5% smaller files, ~2x slower encode
+    "jpeg_subsampling": 2,  # Chroma subsampling: 0 = 4:4:4, 1 = 4:2:2, 2 = 4:2:0 (smallest)
+    "resize_reducing_gap": 3.0,  # Box-reduce before LANCZOS (>=3.0 is visually identical)
+    "max_workers": 8,       # Max threads for resizing photos in parallel
+    "pixels_per_token": 750,  # Claude vision cost: ~(width * height) / 750 tokens per image
+    "api_max_image_tokens": 1600,  # Claude shrinks images above ~1.15 MP, so no image costs more
 }
 
 # ==============================================================================
@@ -113,6 +130,10 @@ IMAGE_CONFIG = {
 CLAUDE_CONFIG = {
     "model": "claude-opus-4-6",
     "max_tokens": 64000,  # Maximum capacity - handles 140+ SKUs
+    "timeout_seconds": 300.0,  # HTTP timeout for the (streaming) API call
+    "stop_sequences": ["}]"],  # End of the JSON array: stops trailing commentary
+    "context_window": 200000,  # Input + output token limit, checked before sending
+    "chars_per_token": 4,  # Rough text-to-token ratio for the pre-flight estimate
     "thinking": {
         "type": "enabled",
         "budget_tokens": 10000  # Balanced thinking for good speed and accuracy
@@ -128,6 +149,8 @@ CLAUDE_CONFIG = {
 PRICING = {
     "input_per_million": 15.00,   # USD per 1M input tokens
     "output_per_million": 75.00,  # USD per 1M output tokens (includes thinking)
+    "cache_write_per_million": 18.75,  # USD per 1M tokens written to the prompt cache (1.25x input)
+    "cache_read_per_million": 1.50,    # USD per 1M tokens read from the prompt cache (0.1x input)
 }
 
 # ==============================================================================
@@ -176,6 +199,17 @@ COLUMN_SCHEMA = [
     {"name": "Notes", "key": "notes", "type": "text"}
 ]
 
+# Columns filled from user metadata rather than Claude's JSON
+METADATA_COLUMN_KEYS = (
+    "country", "city", "retailer", "store_format", "store_name",
+    "shelf_location", "currency"
+)
+
+# Keys Claude returns for each SKU, in column order (listed in the prompt)
+SKU_KEYS = tuple(
+    col["key"] for col in COLUMN_SCHEMA if col["key"] not in METADATA_COLUMN_KEYS
+)
+
 # ==============================================================================
 # EXCEL FORMATTING CONFIGURATION
 # ==============================================================================
@@ -218,5 +252,43 @@ EXCEL_CONFIG = {
     "out_of_stock": {
         "bg": "FFC7CE",
         "font": "9C0006"
+    },
+    
+    # Column widths in Excel character units (approximate), by column name
+    "default_column_width": 15,
+    "column_widths": {
+        "Country": 15,
+        "City": 15,
+        "Retailer": 20,
+        "Store Format": 18,
+        "Store Name": 20,
+        "Photo": 25,
+        "Shelf Location": 25,
+        "Shelf Levels": 12,
+        "Shelf Level": 12,
+        "Product Type": 15,
+        "Branded/Private Label": 20,
+        "Brand": 18,
+        "Sub-brand": 18,
+        "Product Name": 30,
+        "Flavor": 25,
+        "Facings": 10,
+        "Price (Local Currency)": 15,
+        "Currency": 10,
+        "Price (EUR)": 12,
+        "Packaging Size (ml)": 18,
+        "Price per Liter (EUR)": 18,
+        "Need State": 15,
+        "Juice Extraction Method": 22,
+        "Processing Method": 18,
+        "HPP Treatment": 12,
+        "Packaging Type": 18,
+        "Claims": 30,
+        "Bonus/Promotions": 25,
+        "Stock Status": 15,
+        "Est. Linear Meters": 18,
+        "Fridge Number": 15,
+        "Confidence Score": 16,
+        "Notes": 40
     }
 }
@@ -4,20 +4,124 @@ modules/claude_client.py — Claude API communication.
 This module handles sending photos and prompts to Claude Opus 4.6 Extended Thinking
 and parsing the JSON response.
 
-Uses streaming to show real-time progress (thinking vs. generating phases).
+There is exactly one entry point, analyze_shelf(), which uses the streaming API
+so long Extended Thinking responses don't hit HTTP read timeouts.
 Images are resized/compressed before sending to minimize upload payload.
 
 Returns both the parsed SKU data and token usage statistics.
 """
 
 import base64
+import hashlib
 import json
-import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 from anthropic import Anthropic
-from config import CLAUDE_CONFIG
-from modules.image_processor import resize_image
+from config import CLAUDE_CONFIG, IMAGE_CONFIG
+from modules.image_processor import estimate_image_tokens, resize_image
+
+
+class RequestTooLargeError(Exception):
+    """Raised before sending when the request won't fit the context window."""
+
+
+@st.cache_resource(show_spinner=False)
+def _get_client() -> Anthropic:
+    """
+    Return a shared Anthropic client for this Streamlit server process.
+
+    Cached so repeated analyses reuse the same HTTP connection pool instead of
+    paying a fresh TCP + TLS handshake on every call.
+    """
+    return Anthropic(
+        api_key=st.secrets["anthropic_api_key"],
+        timeout=CLAUDE_CONFIG["timeout_seconds"]
+    )
+
+
+def build_request_key(system_prompt: str, user_prompt: str, photos: list[dict]) -> str:
+    """
+    Return a content hash identifying one analysis request.
+
+    Two requests with the same prompts and the same photo bytes (in the same
+    order) get the same key, so the caller can reuse a previous result instead
+    of paying for another multi-minute API call.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(system_prompt.encode("utf-8"))
+    hasher.update(user_prompt.encode("utf-8"))
+    for photo in photos:
+        hasher.update(photo["data"])
+    return hasher.hexdigest()
+
+
+def _process_photos(photos: list[dict]) -> list[tuple[bytes, str]]:
+    """
+    Resize and compress every photo, using a thread pool.
+
+    Pillow releases the GIL while decoding/encoding JPEGs, so photos are
+    processed in parallel. Duplicate uploads are processed once and reused.
+    Results are returned in the same order as `photos`.
+    """
+    if not photos:
+        return []
+
+    # Identical uploads (same bytes + same type) are only processed once
+    unique_photos = {}
+    photo_keys = []
+    for photo in photos:
+        key = (hashlib.blake2b(photo["data"], digest_size=16).digest(), photo["type"])
+        unique_photos.setdefault(key, photo)
+        photo_keys.append(key)
+
+    max_workers = min(IMAGE_CONFIG["max_workers"], len(unique_photos))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(
+            unique_photos.keys(),
+            executor.map(_process_photo, unique_photos.values())
+        ))
+
+    return [results[key] for key in photo_keys]
+
+
+def _process_photo(photo: dict) -> tuple[bytes, str]:
+    """
+    Resize one photo, using the Overview size limit for Overview shots.
+
+    Overviews are the reference for facings counts and deduplication, so
+    IMAGE_CONFIG["overview_max_dimension"] defaults to the full close-up size.
+    Lowering it saves image tokens but is an accuracy trade-off to measure first.
+    """
+    if photo["type"] == "Overview":
+        max_dimension = IMAGE_CONFIG["overview_max_dimension"]
+    else:
+        max_dimension = IMAGE_CONFIG["max_dimension"]
+    return resize_image(photo["data"], photo["filename"], max_dimension)
+
+
+def _check_token_budget(
+    system_prompt: str,
+    user_prompt: str,
+    processed_images: list[tuple[bytes, str]]
+) -> None:
+    """
+    Raise before sending if the request clearly won't fit the context window.
+
+    The estimate (image pixels / 750 + text characters / 4) is rough but
+    free, and it turns a multi-minute call that would be rejected into an
+    immediate, readable error.
+    """
+    image_tokens = sum(estimate_image_tokens(image) for image, _ in processed_images)
+    text_tokens = (len(system_prompt) + len(user_prompt)) // CLAUDE_CONFIG["chars_per_token"]
+    input_budget = CLAUDE_CONFIG["context_window"] - CLAUDE_CONFIG["max_tokens"]
+
+    if image_tokens + text_tokens > input_budget:
+        raise RequestTooLargeError(
+            f"Request too large: about {image_tokens + text_tokens:,} input tokens "
+            f"({len(processed_images)} photos), but only {input_budget:,} fit next to the "
+            f"{CLAUDE_CONFIG['max_tokens']:,}-token output budget. Remove some photos and try again."
+        )
 
 
 def analyze_shelf(
@@ -29,45 +133,55 @@ def analyze_shelf(
     Send photos and prompts to Claude API (streaming) and return parsed results + usage.
 
     Args:
-        system_prompt: The system prompt string (from SYSTEM_PROMPT)
-        user_prompt: The assembled analysis prompt string (from build_prompt)
+        system_prompt: The static system prompt string (from SYSTEM_PROMPT),
+                       sent as a prompt cache breakpoint
+        user_prompt: The per-analysis prompt string (from build_prompt)
         photos: List of dictionaries, each with keys:
                 - filename: str (e.g., "foto_1.jpg")
                 - type: str ("Overview" or "Close-up")
                 - group: int (group number)
-                - data: bytes (raw image bytes from Streamlit file uploader)
+                - data: bytes (image bytes, already rotated/downscaled by the app)
+                - upload_size: int, optional (size of the original upload in
+                  bytes; used for image_savings, defaults to len(data))
 
     Returns:
         Dictionary with keys:
         - skus: List of dictionaries, each representing one SKU row
-        - usage: Dict with input_tokens, output_tokens
+        - usage: Dict with input_tokens, output_tokens, cache_creation_input_tokens,
+                 cache_read_input_tokens
         - elapsed_seconds: float, total API call time
         - image_savings: Dict with original_bytes, processed_bytes
+        - raw_response: str, the cleaned response text (for debugging)
 
     Raises:
+        RequestTooLargeError: If the estimated request won't fit the context window
         Exception: If API call fails or response is invalid JSON
     """
-    client = Anthropic(api_key=st.secrets["anthropic_api_key"], timeout=300.0)
+    client = _get_client()
 
     # Build the messages content array
     content = []
     total_original_bytes = 0
     total_processed_bytes = 0
 
-    for idx, photo in enumerate(photos, start=1):
-        # Text label for this photo
-        photo_label = f"[Photo: {photo['filename']} | {photo['type']} | Group {photo['group']}]"
-        content.append({"type": "text", "text": photo_label})
+    # Resize all photos up front (in parallel), then assemble content in order
+    processed_images = _process_photos(photos)
+    _check_token_budget(system_prompt, user_prompt, processed_images)
 
-        # Resize and compress the image
-        original_bytes = photo["data"]
-        processed_bytes, media_type = resize_image(original_bytes, photo["filename"])
+    for photo_number, (photo, (processed_bytes, media_type)) in enumerate(
+        zip(photos, processed_images), start=1
+    ):
+        # Short label only: filename/type/group are already listed once in the
+        # prompt's photo list block under the same "Photo N" number
+        content.append({"type": "text", "text": f"[Photo {photo_number}]"})
 
-        total_original_bytes += len(original_bytes)
+        # Compare against the original upload, not the already-downscaled data
+        total_original_bytes += photo.get("upload_size", len(photo["data"]))
         total_processed_bytes += len(processed_bytes)
 
-        # Base64 encode the processed image
-        image_base64 = base64.b64encode(processed_bytes).decode("utf-8")
+        # Base64 encode the processed image (base64 output is pure ASCII,
+        # so the ASCII decoder avoids the UTF-8 validation pass)
+        image_base64 = base64.b64encode(processed_bytes).decode("ascii")
 
         content.append({
             "type": "image",
@@ -84,75 +198,90 @@ def analyze_shelf(
     start_time = time.time()
     collected_text = ""
 
+    with client.messages.stream(
+        model=CLAUDE_CONFIG["model"],
+        max_tokens=CLAUDE_CONFIG["max_tokens"],
+        thinking=CLAUDE_CONFIG["thinking"],
+        stop_sequences=CLAUDE_CONFIG["stop_sequences"],
+        # The system prompt holds all static instructions; marking it as a
+        # cache breakpoint lets repeat analyses (within the cache TTL) read
+        # it from Claude's prompt cache instead of reprocessing it
+        system=[{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }],
+        messages=[{"role": "user", "content": content}]
+    ) as stream:
+        for event in stream:
+            event_type = getattr(event, "type", None)
+
+            if event_type == "content_block_delta":
+                delta = event.delta
+                if getattr(delta, "type", None) == "text_delta":
+                    collected_text += delta.text
+
+        final_message = stream.get_final_message()
+
+    # The matched stop sequence is not included in the text; it is the
+    # closing "}]" of the JSON array, so put it back
+    if final_message.stop_reason == "stop_sequence":
+        collected_text += final_message.stop_sequence
+
+    elapsed = time.time() - start_time
+
+    # Extract usage from the final message
+    # input_tokens excludes prompt-cache tokens, which are billed separately
+    # (the cache fields can be None when caching didn't apply)
+    usage = {
+        "input_tokens": final_message.usage.input_tokens,
+        "output_tokens": final_message.usage.output_tokens,
+        "cache_creation_input_tokens": final_message.usage.cache_creation_input_tokens or 0,
+        "cache_read_input_tokens": final_message.usage.cache_read_input_tokens or 0,
+    }
+
+    response_text = collected_text.strip()
+
+    # Strip markdown code fences if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.startswith("```"):
+        response_text = response_text[3:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    response_text = response_text.strip()
+
+    # Try direct parse first
+    parsed_json = None
     try:
-        with client.messages.stream(
-            model=CLAUDE_CONFIG["model"],
-            max_tokens=CLAUDE_CONFIG["max_tokens"],
-            thinking=CLAUDE_CONFIG["thinking"],
-            system=system_prompt,
-            messages=[{"role": "user", "content": content}]
-        ) as stream:
-            for event in stream:
-                event_type = getattr(event, "type", None)
-
-                if event_type == "content_block_delta":
-                    delta = event.delta
-                    if getattr(delta, "type", None) == "text_delta":
-                        collected_text += delta.text
-
-            final_message = stream.get_final_message()
-
-        elapsed = time.time() - start_time
-
-        # Extract usage from the final message
-        usage = {
-            "input_tokens": final_message.usage.input_tokens,
-            "output_tokens": final_message.usage.output_tokens,
-        }
-
-        response_text = collected_text.strip()
-
-        # Strip markdown code fences if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-
-        # Try direct parse first
-        parsed_json = None
-        try:
-            parsed_json = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Fallback: extract the JSON array from surrounding text
-            match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if match:
-                try:
-                    parsed_json = json.loads(match.group(0))
-                except json.JSONDecodeError:
-                    pass
-
-        if parsed_json is None:
-            preview = response_text[:500] if len(response_text) > 500 else response_text
-            error_msg = (
-                f"Claude returned invalid JSON. Could not parse a JSON array from the response.\n\n"
-                f"Raw response preview:\n{preview}"
-            )
-            raise Exception(error_msg)
-
-        return {
-            "skus": parsed_json,
-            "usage": usage,
-            "elapsed_seconds": elapsed,
-            "image_savings": {
-                "original_bytes": total_original_bytes,
-                "processed_bytes": total_processed_bytes,
-            },
-            "raw_response": response_text
-        }
-
-    except Exception as e:
-        # Re-raise the exception to be handled by the caller
-        raise
+        parsed_json = json.loads(response_text)
+    except json.JSONDecodeError:
+        # Fallback: extract the JSON array from surrounding text.
+        # Slicing between the first "[" and last "]" is equivalent to the
+        # greedy regex r"\[.*\]" but avoids scanning/backtracking the whole text.
+        array_start = response_text.find("[")
+        array_end = response_text.rfind("]")
+        if array_start != -1 and array_end > array_start:
+            try:
+                parsed_json = json.loads(response_text[array_start:array_end + 1])
+            except json.JSONDecodeError:
+                pass
+
+    if parsed_json is None:
+        preview = response_text[:500] if len(response_text) > 500 else response_text
+        error_msg = (
+            f"Claude returned invalid JSON. Could not parse a JSON array from the response.\n\n"
+            f"Raw response preview:\n{preview}"
+        )
+        raise Exception(error_msg)
+
+    return {
+        "skus": parsed_json,
+        "usage": usage,
+        "elapsed_seconds": elapsed,
+        "image_savings": {
+            "original_bytes": total_original_bytes,
+            "processed_bytes": total_processed_bytes,
+        },
+        "raw_response": response_text
+    }
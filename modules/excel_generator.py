@@ -11,10 +11,74 @@ This module converts Claude's JSON response into a formatted Excel file with:
 """
 
 import io
+import math
+import re
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from config import COLUMN_SCHEMA, EXCEL_CONFIG
+from config import COLUMN_SCHEMA, EXCEL_CONFIG, METADATA_COLUMN_KEYS
+
+# Schema-derived lookups, computed once at import instead of on every call/cell
+# Header names in exact column order
+HEADER_ROW = tuple(col["name"] for col in COLUMN_SCHEMA)
+
+# Columns filled from user metadata rather than Claude's JSON
+METADATA_KEYS = frozenset(METADATA_COLUMN_KEYS)
+
+# Zero-based positions of the conditionally formatted columns
+SCHEMA_KEYS = tuple(col["key"] for col in COLUMN_SCHEMA)
+CONFIDENCE_COL_INDEX = SCHEMA_KEYS.index("confidence_score")
+STOCK_STATUS_COL_INDEX = SCHEMA_KEYS.index("stock_status")
+
+# Numeric strings with comma thousands separators ("1,000", "12,500.50") and
+# with a decimal comma ("2,99"), used by _coerce_value
+THOUSANDS_NUMBER = re.compile(r"^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$")
+DECIMAL_COMMA_NUMBER = re.compile(r"^[+-]?\d+,\d{1,2}$")
+
+# (column letter, width) pairs in column order; columns not listed in the
+# config get the default width
+COLUMN_WIDTHS = tuple(
+    (
+        get_column_letter(col_index),
+        EXCEL_CONFIG["column_widths"].get(col["name"], EXCEL_CONFIG["default_column_width"])
+    )
+    for col_index, col in enumerate(COLUMN_SCHEMA, start=1)
+)
+
+
+def _solid_fill(color: str) -> PatternFill:
+    """Build a solid background fill for the given hex color."""
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def _font(color: str, bold: bool = False) -> Font:
+    """Build a data font (configured name/size) in the given hex color."""
+    return Font(
+        name=EXCEL_CONFIG["font_name"],
+        size=EXCEL_CONFIG["font_size"],
+        color=color,
+        bold=bold
+    )
+
+
+# Cell styles, built once at import and shared by every cell that uses them
+# (openpyxl style objects are immutable, so sharing is safe)
+DATA_ALIGNMENT = Alignment(wrap_text=False, vertical="center")
+
+# (fill, font) pairs for Confidence Score conditional formatting
+CONFIDENCE_STYLES = {
+    level: (
+        _solid_fill(EXCEL_CONFIG[f"confidence_{level}"]["bg"]),
+        _font(EXCEL_CONFIG[f"confidence_{level}"]["font"])
+    )
+    for level in ("high", "mid", "low")
+}
+
+# (fill, font) pair for "Out of Stock" cells
+OUT_OF_STOCK_STYLE = (
+    _solid_fill(EXCEL_CONFIG["out_of_stock"]["bg"]),
+    _font(EXCEL_CONFIG["out_of_stock"]["font"], bold=True)
+)
 
 
 def generate_excel(skus: list[dict], metadata: dict) -> bytes:
@@ -39,9 +103,7 @@ def generate_excel(skus: list[dict], metadata: dict) -> bytes:
     # STEP 1: WRITE HEADER ROW
     # ==============================================================================
     
-    # Extract column names from COLUMN_SCHEMA
-    header_row = [col["name"] for col in COLUMN_SCHEMA]
-    ws.append(header_row)
+    ws.append(HEADER_ROW)
     
     # Style the header row
     header_fill = PatternFill(
@@ -103,13 +165,16 @@ def generate_excel(skus: list[dict], metadata: dict) -> bytes:
             
             # USER-PROVIDED COLUMNS: Get value from metadata dict, NOT from Claude's JSON
             # This ensures consistency even if Claude returns slightly different values
-            if key in ["country", "city", "retailer", "store_format", "store_name", 
-                       "shelf_location", "currency"]:
+            if key in METADATA_KEYS:
                 value = metadata.get(key, "")
             else:
                 # AI-PROVIDED COLUMNS: Get value from Claude's JSON
                 value = sku.get(key)
             
+            # Coerce to the schema type so numbers land in Excel as numbers
+            # (a string "12" would break the Price per Liter formula)
+            value = _coerce_value(value, col["type"])
+            
             # Handle None/null values gracefully
             if value is None:
                 value = ""
@@ -120,7 +185,8 @@ def generate_excel(skus: list[dict], metadata: dict) -> bytes:
         ws.append(row_data)
         
         # Apply styling to each cell in the row
-        for col_index, cell in enumerate(ws[current_row], start=1):
+        row_cells = ws[current_row]
+        for col_index, cell in enumerate(row_cells, start=1):
             # Apply font
             cell.font = data_font
             
@@ -132,7 +198,11 @@ def generate_excel(skus: list[dict], metadata: dict) -> bytes:
                 cell.fill = alt_fill
             
             # Disable text wrapping
-            cell.alignment = Alignment(wrap_text=False, vertical="center")
+            cell.alignment = DATA_ALIGNMENT
+        
+        # Conditional formatting is applied in the same pass (no second loop
+        # over the sheet), reading values from row_data rather than the cells
+        _apply_conditional_formatting(row_cells, row_data)
         
         # Set row height
         ws.row_dimensions[current_row].height = EXCEL_CONFIG["data_row_height"]
@@ -156,126 +226,15 @@ def generate_excel(skus: list[dict], metadata: dict) -> bytes:
         price_per_liter_cell.value = formula
     
     # ==============================================================================
-    # STEP 3: CONDITIONAL FORMATTING
+    # STEP 3: AUTO-ADJUST COLUMN WIDTHS
     # ==============================================================================
     
-    # Apply conditional formatting to all data rows (starting from row 2)
-    for row_index in range(2, len(skus) + 2):
-        
-        # --- CONFIDENCE SCORE (Column 32, column AF in Excel) ---
-        confidence_col_index = 32  # Column AF
-        confidence_cell = ws.cell(row=row_index, column=confidence_col_index)
-        confidence_value = confidence_cell.value
-        
-        # Apply color based on confidence score thresholds
-        if confidence_value is not None and isinstance(confidence_value, (int, float)):
-            if confidence_value >= EXCEL_CONFIG["confidence_high"]["min"]:
-                # High confidence: green fill + dark green text
-                confidence_cell.fill = PatternFill(
-                    start_color=EXCEL_CONFIG["confidence_high"]["bg"],
-                    end_color=EXCEL_CONFIG["confidence_high"]["bg"],
-                    fill_type="solid"
-                )
-                confidence_cell.font = Font(
-                    name=EXCEL_CONFIG["font_name"],
-                    size=EXCEL_CONFIG["font_size"],
-                    color=EXCEL_CONFIG["confidence_high"]["font"]
-                )
-            elif confidence_value >= EXCEL_CONFIG["confidence_mid"]["min"]:
-                # Mid confidence: yellow fill + dark yellow text
-                confidence_cell.fill = PatternFill(
-                    start_color=EXCEL_CONFIG["confidence_mid"]["bg"],
-                    end_color=EXCEL_CONFIG["confidence_mid"]["bg"],
-                    fill_type="solid"
-                )
-                confidence_cell.font = Font(
-                    name=EXCEL_CONFIG["font_name"],
-                    size=EXCEL_CONFIG["font_size"],
-                    color=EXCEL_CONFIG["confidence_mid"]["font"]
-                )
-            else:
-                # Low confidence: red fill + dark red text
-                confidence_cell.fill = PatternFill(
-                    start_color=EXCEL_CONFIG["confidence_low"]["bg"],
-                    end_color=EXCEL_CONFIG["confidence_low"]["bg"],
-                    fill_type="solid"
-                )
-                confidence_cell.font = Font(
-                    name=EXCEL_CONFIG["font_name"],
-                    size=EXCEL_CONFIG["font_size"],
-                    color=EXCEL_CONFIG["confidence_low"]["font"]
-                )
-        
-        # --- STOCK STATUS (Column 29, column AC in Excel) ---
-        stock_status_col_index = 29  # Column AC
-        stock_status_cell = ws.cell(row=row_index, column=stock_status_col_index)
-        stock_status_value = stock_status_cell.value
-        
-        # Apply red formatting if "Out of Stock"
-        if stock_status_value == "Out of Stock":
-            stock_status_cell.fill = PatternFill(
-                start_color=EXCEL_CONFIG["out_of_stock"]["bg"],
-                end_color=EXCEL_CONFIG["out_of_stock"]["bg"],
-                fill_type="solid"
-            )
-            stock_status_cell.font = Font(
-                name=EXCEL_CONFIG["font_name"],
-                size=EXCEL_CONFIG["font_size"],
-                color=EXCEL_CONFIG["out_of_stock"]["font"],
-                bold=True
-            )
-    
-    # ==============================================================================
-    # STEP 4: AUTO-ADJUST COLUMN WIDTHS
-    # ==============================================================================
-    
-    # Define reasonable default widths based on column content type
-    # These widths are in Excel character units (approximate)
-    column_widths = {
-        "Country": 15,
-        "City": 15,
-        "Retailer": 20,
-        "Store Format": 18,
-        "Store Name": 20,
-        "Photo": 25,
-        "Shelf Location": 25,
-        "Shelf Levels": 12,
-        "Shelf Level": 12,
-        "Product Type": 15,
-        "Branded/Private Label": 20,
-        "Brand": 18,
-        "Sub-brand": 18,
-        "Product Name": 30,
-        "Flavor": 25,
-        "Facings": 10,
-        "Price (Local Currency)": 15,
-        "Currency": 10,
-        "Price (EUR)": 12,
-        "Packaging Size (ml)": 18,
-        "Price per Liter (EUR)": 18,
-        "Need State": 15,
-        "Juice Extraction Method": 22,
-        "Processing Method": 18,
-        "HPP Treatment": 12,
-        "Packaging Type": 18,
-        "Claims": 30,
-        "Bonus/Promotions": 25,
-        "Stock Status": 15,
-        "Est. Linear Meters": 18,
-        "Fridge Number": 15,
-        "Confidence Score": 16,
-        "Notes": 40
-    }
-    
-    # Apply column widths
-    for col_index, col in enumerate(COLUMN_SCHEMA, start=1):
-        col_letter = get_column_letter(col_index)
-        col_name = col["name"]
-        width = column_widths.get(col_name, 15)  # Default to 15 if not specified
+    # Apply column widths (letters and widths precomputed from the schema)
+    for col_letter, width in COLUMN_WIDTHS:
         ws.column_dimensions[col_letter].width = width
     
     # ==============================================================================
-    # STEP 5: SAVE TO BYTES AND RETURN
+    # STEP 4: SAVE TO BYTES AND RETURN
     # ==============================================================================
     
     # Save workbook to a BytesIO buffer (in-memory, not to disk)
@@ -284,3 +243,77 @@ def generate_excel(skus: list[dict], metadata: dict) -> bytes:
     
     # Return the bytes content
     return buffer.getvalue()
+
+
+def _apply_conditional_formatting(row_cells: tuple, row_data: list) -> None:
+    """
+    Color the Confidence Score and Stock Status cells of one data row.
+    
+    - Confidence Score: green / yellow / red by threshold
+    - Stock Status: red + bold if "Out of Stock"
+    """
+    # --- CONFIDENCE SCORE ---
+    confidence_value = row_data[CONFIDENCE_COL_INDEX]
+    
+    # Apply color based on confidence score thresholds
+    if isinstance(confidence_value, (int, float)):
+        if confidence_value >= EXCEL_CONFIG["confidence_high"]["min"]:
+            # High confidence: green fill + dark green text
+            confidence_style = CONFIDENCE_STYLES["high"]
+        elif confidence_value >= EXCEL_CONFIG["confidence_mid"]["min"]:
+            # Mid confidence: yellow fill + dark yellow text
+            confidence_style = CONFIDENCE_STYLES["mid"]
+        else:
+            # Low confidence: red fill + dark red text
+            confidence_style = CONFIDENCE_STYLES["low"]
+        confidence_cell = row_cells[CONFIDENCE_COL_INDEX]
+        confidence_cell.fill, confidence_cell.font = confidence_style
+    
+    # --- STOCK STATUS ---
+    # Apply red formatting if "Out of Stock"
+    if row_data[STOCK_STATUS_COL_INDEX] == "Out of Stock":
+        stock_status_cell = row_cells[STOCK_STATUS_COL_INDEX]
+        stock_status_cell.fill, stock_status_cell.font = OUT_OF_STOCK_STYLE
+
+
+def _coerce_value(value, col_type: str):
+    """
+    Convert a raw JSON value to the type declared in COLUMN_SCHEMA.
+    
+    Claude occasionally returns numbers as strings (e.g., "12", "2,99", "1,000",
+    "90%"). Integer/float columns are parsed into real numbers; anything that
+    can't be parsed unambiguously (or isn't a finite number, or isn't whole for
+    an integer column) is returned unchanged so no data is lost or corrupted.
+    Text columns pass through.
+    """
+    if value is None or col_type == "text" or isinstance(value, bool):
+        return value
+    
+    if isinstance(value, str):
+        cleaned = value.strip().rstrip("%").strip()
+        if cleaned == "":
+            return None
+        if THOUSANDS_NUMBER.match(cleaned):
+            # "1,000" / "1,500.50": commas are thousands separators
+            cleaned = cleaned.replace(",", "")
+        elif DECIMAL_COMMA_NUMBER.match(cleaned):
+            # "2,99": the only separator, 1-2 digits after it -> decimal comma
+            cleaned = cleaned.replace(",", ".")
+        elif "," in cleaned:
+            return value
+        try:
+            number = float(cleaned)
+        except ValueError:
+            return value
+    elif isinstance(value, (int, float)):
+        number = value
+    else:
+        return value
+    
+    # openpyxl writes NaN/inf in a form Excel reports as a corrupt file
+    if not math.isfinite(number):
+        return value if isinstance(value, str) else None
+    
+    if col_type == "integer":
+        return int(number) if float(number).is_integer() else value
+    return float(number)
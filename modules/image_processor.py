@@ -1,5 +1,5 @@
 """
-modules/image_processor.py — Image resizing and compression.
+modules/image_processor.py — Image resizing, compression and rotation.
 
 Resizes photos to fit within Claude's max processing resolution (1568px)
 and compresses as JPEG to reduce upload payload size.
@@ -9,14 +9,72 @@ so doing it client-side saves upload bandwidth without any quality loss.
 """
 
 import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
 from PIL import Image
 from config import IMAGE_CONFIG
 
+# Maps a clockwise UI rotation angle to the equivalent Pillow transpose.
+# Pillow's ROTATE_* constants are counter-clockwise, hence the swap.
+CLOCKWISE_TRANSPOSE = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
 
-def resize_image(image_bytes: bytes, filename: str) -> tuple[bytes, str]:
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    """
+    Encode an image as JPEG with the IMAGE_CONFIG encoder settings.
+
+    Shared by resize_image and rotate_photo so every JPEG the app produces
+    uses the same optimize/subsampling settings, whichever path it took.
+    """
+    buffer = io.BytesIO()
+    img.save(
+        buffer,
+        format="JPEG",
+        quality=quality,
+        optimize=IMAGE_CONFIG["optimize_jpeg"],
+        subsampling=IMAGE_CONFIG["jpeg_subsampling"],
+        progressive=False
+    )
+    return buffer.getvalue()
+
+
+def _flatten_transparency(img: Image.Image) -> Image.Image:
+    """
+    Composite an image with transparency onto white; convert palette images to RGB.
+
+    JPEG has no alpha. A plain convert("RGB") just drops it, which can turn
+    transparent areas black — and dark gaps read as out-of-stock slots to the
+    model. Covers RGBA, LA/PA and palette (or RGB/L) images with a
+    transparency key. Images without transparency are returned unchanged
+    (except palette images, which become RGB).
+    """
+    if img.mode == "P" or "transparency" in img.info:
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+    if img.mode in ("RGBA", "LA", "PA"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+
+    return img
+
+
+def resize_image(
+    image_bytes: bytes,
+    filename: str,
+    max_dimension: int | None = None
+) -> tuple[bytes, str]:
     """
     Resize and compress an image for optimal Claude API transmission.
 
+    - If the input is already an RGB JPEG within IMAGE_CONFIG["max_dimension"]
+      and has no EXIF data, the original bytes are returned untouched (no re-encode).
     - If the longest side exceeds IMAGE_CONFIG["max_dimension"], resize proportionally.
     - Always outputs JPEG (converts PNG/RGBA to RGB first).
     - Compresses with IMAGE_CONFIG["jpeg_quality"].
@@ -24,35 +82,163 @@ def resize_image(image_bytes: bytes, filename: str) -> tuple[bytes, str]:
     Args:
         image_bytes: Raw image bytes from the file uploader
         filename: Original filename (used for logging only)
+        max_dimension: Optional longest-side limit in px; defaults to
+                       IMAGE_CONFIG["max_dimension"]
 
     Returns:
         Tuple of (processed_bytes, media_type)
         media_type is always "image/jpeg" after processing
     """
-    max_dim = IMAGE_CONFIG["max_dimension"]
+    max_dim = max_dimension or IMAGE_CONFIG["max_dimension"]
     quality = IMAGE_CONFIG["jpeg_quality"]
 
-    img = Image.open(io.BytesIO(image_bytes))
-    original_w, original_h = img.size
+    # Single pass: decode -> (mode convert) -> resize -> encode.
+    # The `with` block closes the decoder as soon as the JPEG is written, and
+    # each step replaces `img` so only one full-size buffer is alive at a time.
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        # Fast path: Image.open only reads the header, so an RGB JPEG that is
+        # already small enough is returned as-is without a decode/encode cycle.
+        # Only without EXIF data: re-encoding strips GPS/device metadata and
+        # the orientation tag, which must not be sent to the API.
+        if (
+            img.format == "JPEG"
+            and img.mode == "RGB"
+            and max(img.size) <= max_dim
+            and not img.getexif()
+        ):
+            return image_bytes, "image/jpeg"
 
-    # Determine if resizing is needed
-    longest_side = max(original_w, original_h)
-    resized = False
+        # Flatten transparency / convert palette images BEFORE resizing: Pillow
+        # silently falls back to NEAREST resampling for "P" mode, and JPEG
+        # needs RGB anyway
+        img = _flatten_transparency(img)
 
-    if longest_side > max_dim:
-        scale = max_dim / longest_side
-        new_w = int(original_w * scale)
-        new_h = int(original_h * scale)
-        img = img.resize((new_w, new_h), Image.LANCZOS)
-        resized = True
+        # Determine if resizing is needed
+        original_w, original_h = img.size
+        longest_side = max(original_w, original_h)
 
-    # Convert RGBA/P to RGB (required for JPEG)
-    if img.mode in ("RGBA", "P"):
-        img = img.convert("RGB")
+        if longest_side > max_dim:
+            scale = max_dim / longest_side
+            new_w = int(original_w * scale)
+            new_h = int(original_h * scale)
+            # For JPEGs, ask libjpeg to decode at a reduced DCT scale (1/2, 1/4, 1/8)
+            # that is still >= the target size. This skips most of the full-size
+            # decode work. No-op for other formats.
+            img.draft(img.mode, (new_w, new_h))
+            # reducing_gap lets Pillow do a fast integer box-reduce first, then run
+            # LANCZOS only over the much smaller intermediate image
+            img = img.resize(
+                (new_w, new_h),
+                Image.LANCZOS,
+                reducing_gap=IMAGE_CONFIG["resize_reducing_gap"]
+            )
 
-    # Compress to JPEG
-    buffer = io.BytesIO()
-    img.save(buffer, format="JPEG", quality=quality, optimize=True)
-    processed_bytes = buffer.getvalue()
+        # Compress to JPEG
+        return _encode_jpeg(img, quality), "image/jpeg"
+
+
+def estimate_image_tokens(image_bytes: bytes) -> int:
+    """
+    Estimate how many input tokens Claude will charge for one image.
+
+    Uses Anthropic's published approximation of (width * height) / 750,
+    capped at IMAGE_CONFIG["api_max_image_tokens"] because Claude downscales
+    larger images (above ~1.15 MP) before counting them.
+    Image.open only reads the header, so this does not decode the image.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        width, height = img.size
+    return min(
+        math.ceil(width * height / IMAGE_CONFIG["pixels_per_token"]),
+        IMAGE_CONFIG["api_max_image_tokens"]
+    )
+
+
+def rotate_photo(image_file: BinaryIO, angle: int) -> tuple[bytes, bytes]:
+    """
+    Apply the user's rotation to an uploaded photo and encode it as JPEG.
+
+    Args:
+        image_file: Seekable file-like object (e.g., a Streamlit UploadedFile).
+                    Read directly, so the upload is never copied into a new
+                    bytes object first.
+        angle: Clockwise rotation in degrees (multiple of 90)
+
+    Returns:
+        Tuple of (preview_bytes, rotated_bytes):
+        - preview_bytes: small thumbnail for the UI (the browser only shows
+          ~150px, so shipping full-resolution photos wastes bandwidth)
+        - rotated_bytes: photo sent to Claude (via resize_image), already
+          capped at IMAGE_CONFIG["max_dimension"]
+    """
+    max_dim = IMAGE_CONFIG["max_dimension"]
+    preview_dim = IMAGE_CONFIG["preview_max_dimension"]
+
+    image_file.seek(0)
+    with Image.open(image_file) as img:
+        # An unrotated RGB JPEG that is already small enough can be sent as-is:
+        # only the (cheap) preview thumbnail needs to be encoded. Photos with
+        # EXIF data are re-encoded instead: that strips GPS/device metadata,
+        # and an EXIF orientation tag would make Claude see a different
+        # orientation than the (tag-less) preview the user rotates against.
+        if (
+            angle == 0
+            and img.format == "JPEG"
+            and img.mode == "RGB"
+            and max(img.size) <= max_dim
+            and not img.getexif()
+        ):
+            img.thumbnail((preview_dim, preview_dim), Image.LANCZOS)
+            preview_bytes = _encode_jpeg(img, IMAGE_CONFIG["preview_jpeg_quality"])
+            image_file.seek(0)
+            return preview_bytes, image_file.read()
+
+        # Claude never uses more than max_dimension px, so downscale right away:
+        # smaller images are cheaper to rotate, store and upload. draft() lets
+        # libjpeg decode JPEGs at a reduced scale (no-op for PNG); the requested
+        # size must keep the aspect ratio, since draft() never goes below it.
+        scale = max_dim / max(img.size)
+        if scale < 1:
+            img.draft("RGB", (int(img.width * scale), int(img.height * scale)))
+        img = _flatten_transparency(img).convert("RGB")
+        img.thumbnail(
+            (max_dim, max_dim),
+            Image.LANCZOS,
+            reducing_gap=IMAGE_CONFIG["resize_reducing_gap"]
+        )
+        if angle != 0:
+            # transpose() is a pure pixel-reordering copy for 90° steps, unlike
+            # rotate(), which resamples every pixel through an affine transform
+            img = img.transpose(CLOCKWISE_TRANSPOSE[angle])
+
+        # Encoded with the same settings as resize_image (shared _encode_jpeg),
+        # so close-ups hit its "already small enough" fast path and aren't
+        # re-encoded before sending
+        rotated_bytes = _encode_jpeg(img, IMAGE_CONFIG["jpeg_quality"])
+
+        # Shrink in place — the full-size image isn't needed after this point
+        img.thumbnail((preview_dim, preview_dim), Image.LANCZOS)
+        preview_bytes = _encode_jpeg(img, IMAGE_CONFIG["preview_jpeg_quality"])
+
+    return preview_bytes, rotated_bytes
+
+
+def rotate_photos(photos: list[tuple[BinaryIO, int]]) -> list[tuple[bytes, bytes]]:
+    """
+    Run rotate_photo() over many photos in parallel.
+
+    Pillow releases the GIL while decoding/encoding JPEGs, so a thread pool
+    gives near-linear speedup. Results are returned in input order.
+
+    Args:
+        photos: List of (image_file, angle) tuples
+
+    Returns:
+        List of (preview_bytes, rotated_bytes) tuples
+    """
+    if not photos:
+        return []
 
-    return processed_bytes, "image/jpeg"
+    max_workers = min(IMAGE_CONFIG["max_workers"], len(photos))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda photo: rotate_photo(*photo), photos))
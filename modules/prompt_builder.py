@@ -6,8 +6,85 @@ and fills in the placeholders in the ANALYSIS_PROMPT template from
 prompts/shelf_analysis.py.
 """
 
-from prompts.shelf_analysis import ANALYSIS_PROMPT
-from config import EXCHANGE_RATES
+import re
+import string
+from prompts.shelf_analysis import ANALYSIS_PROMPT, SYSTEM_PROMPT
+from config import COLUMN_SCHEMA, EXCHANGE_RATES
+
+# Fixed layout of the metadata block, filled in with str.format_map()
+METADATA_TEMPLATE = (
+    "- Country: {country}\n"
+    "- City: {city}\n"
+    "- Retailer: {retailer}\n"
+    "- Store Format: {store_format}\n"
+    "- Store Name: {store_name}\n"
+    "- Shelf Location: {shelf_location}\n"
+    "- Currency: {currency}\n"
+    "- Exchange Rate: 1 GBP = {exchange_rate} EUR"
+)
+
+# Transcript block text when no transcript was uploaded
+NO_TRANSCRIPT_TEXT = "No transcript provided."
+
+# Placeholders ANALYSIS_PROMPT must contain, in this order
+PROMPT_PLACEHOLDERS = ("metadata_block", "photo_list_block", "transcript_block")
+
+
+def _split_prompt_template(template: str) -> tuple[str, ...]:
+    """
+    Validate the template's placeholders and split it around them.
+    
+    Runs once at import, so a typo in a placeholder fails immediately on app
+    start instead of on the first (slow, paid) analysis.
+    
+    Returns:
+        The literal text segments between placeholders (one more than the
+        number of placeholders)
+    """
+    segments = []
+    found = []
+    literal_parts = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        literal_parts.append(literal)
+        if field is None:
+            continue
+        if format_spec or conversion:
+            raise ValueError(f"Prompt placeholder {{{field}}} must not use a format spec or conversion")
+        found.append(field)
+        segments.append("".join(literal_parts))
+        literal_parts = []
+    segments.append("".join(literal_parts))
+    
+    if tuple(found) != PROMPT_PLACEHOLDERS:
+        raise ValueError(
+            f"ANALYSIS_PROMPT placeholders {found} do not match {list(PROMPT_PLACEHOLDERS)}"
+        )
+    return tuple(segments)
+
+
+def _check_column_table(system_prompt: str) -> None:
+    """
+    Check that the prompt's column table matches COLUMN_SCHEMA.
+    
+    The table rows ("N Name | Source | Description") must list every schema
+    column, numbered and named exactly as in the Excel output. Runs once at
+    import so an edit to either side that breaks the match fails on app start.
+    """
+    table_rows = re.findall(r"^(\d+) ([^|\n]+?) \|", system_prompt, flags=re.MULTILINE)
+    table_columns = [(int(number), name) for number, name in table_rows]
+    schema_columns = [(number, col["name"]) for number, col in enumerate(COLUMN_SCHEMA, start=1)]
+    if table_columns != schema_columns:
+        mismatches = sorted(set(table_columns) ^ set(schema_columns))
+        raise ValueError(f"Prompt column table does not match COLUMN_SCHEMA: {mismatches}")
+
+
+_check_column_table(SYSTEM_PROMPT)
+
+# ANALYSIS_PROMPT split once at import around its three placeholders, so
+# build_prompt only joins strings instead of re-parsing the template each call
+PROMPT_HEAD, PROMPT_AFTER_METADATA, PROMPT_AFTER_PHOTOS, PROMPT_TAIL = (
+    _split_prompt_template(ANALYSIS_PROMPT)
+)
 
 
 def build_prompt(
@@ -23,6 +100,8 @@ def build_prompt(
                   store_name, shelf_location, currency, exchange_rate
         photo_tags: List of dictionaries, each with keys: filename, type, group
                     Example: [{"filename": "foto_1.jpg", "type": "Overview", "group": 1}, ...]
+                    Other keys (e.g., the photo "data" bytes) are ignored, so the
+                    session's photo tags can be passed as-is without copying.
         transcript_text: Optional string containing transcript content, or None
     
     Returns:
@@ -37,12 +116,13 @@ def build_prompt(
     # Build transcript block
     transcript_block = _build_transcript_block(transcript_text)
     
-    # Fill in the template placeholders
-    complete_prompt = ANALYSIS_PROMPT.format(
-        metadata_block=metadata_block,
-        photo_list_block=photo_list_block,
-        transcript_block=transcript_block
-    )
+    # Fill in the template placeholders (pre-split template, see top of module)
+    complete_prompt = "".join((
+        PROMPT_HEAD, metadata_block,
+        PROMPT_AFTER_METADATA, photo_list_block,
+        PROMPT_AFTER_PHOTOS, transcript_block,
+        PROMPT_TAIL
+    ))
     
     return complete_prompt
 
@@ -61,21 +141,10 @@ def _build_metadata_block(metadata: dict) -> str:
     - Currency: GBP
     - Exchange Rate: 1 GBP = 1.17 EUR
     """
-    # Get exchange rate from config
-    exchange_rate = EXCHANGE_RATES["GBP_TO_EUR"]
-    
-    lines = [
-        f"- Country: {metadata['country']}",
-        f"- City: {metadata['city']}",
-        f"- Retailer: {metadata['retailer']}",
-        f"- Store Format: {metadata['store_format']}",
-        f"- Store Name: {metadata['store_name']}",
-        f"- Shelf Location: {metadata['shelf_location']}",
-        f"- Currency: {metadata['currency']}",
-        f"- Exchange Rate: 1 GBP = {exchange_rate} EUR"
-    ]
-    
-    return "\n".join(lines)
+    # Exchange rate always comes from config, not from the metadata dict
+    return METADATA_TEMPLATE.format_map(
+        {**metadata, "exchange_rate": EXCHANGE_RATES["GBP_TO_EUR"]}
+    )
 
 
 def _build_photo_list_block(photo_tags: list[dict]) -> str:
@@ -87,23 +156,22 @@ def _build_photo_list_block(photo_tags: list[dict]) -> str:
     [Photo 2: foto_1a.jpg | Close-up | Group 1]
     [Photo 3: foto_2.jpg | Overview | Group 2]
     """
-    lines = []
-    for i, photo in enumerate(photo_tags, start=1):
-        line = f"[Photo {i}: {photo['filename']} | {photo['type']} | Group {photo['group']}]"
-        lines.append(line)
-    
-    return "\n".join(lines)
+    return "\n".join(
+        f"[Photo {i}: {photo['filename']} | {photo['type']} | Group {photo['group']}]"
+        for i, photo in enumerate(photo_tags, start=1)
+    )
 
 
 def _build_transcript_block(transcript_text: str | None) -> str:
     """
-    Build the transcript block string.
+    Build the transcript block string (the "## TRANSCRIPT" header is part of
+    the template, so the prompt layout is the same with or without one).
     
     Returns:
-    - If transcript_text is provided: "## TRANSCRIPT\n\n{transcript_text}"
-    - If None or empty: "" (empty string)
+    - If transcript_text is provided: the transcript text
+    - If None or empty: NO_TRANSCRIPT_TEXT
     """
     if transcript_text and transcript_text.strip():
-        return f"## TRANSCRIPT\n\n{transcript_text}"
+        return transcript_text
     else:
-        return ""
+        return NO_TRANSCRIPT_TEXT
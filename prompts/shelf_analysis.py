@@ -6,39 +6,39 @@ This is the most important file in the project. It determines the quality
 of Claude's output. Keep it in its own file so you can edit the prompt
 without touching any code logic.
 
-The prompt has placeholders like {metadata_block} and {photo_list_block}
-that get filled in dynamically by prompt_builder.py at runtime.
-
-Note: Double curly braces {{ }} are used in the JSON example because
-Python's .format() method uses single curly braces {} for placeholders.
-Double braces tell Python "this is a literal brace, not a placeholder."
+The prompt is split in two:
+- SYSTEM_PROMPT: the role plus all static instructions (steps, column table,
+  quality checks, output format). It is identical on every call, so Claude's
+  prompt cache can reuse it across analyses.
+- ANALYSIS_PROMPT: the short per-analysis part, with placeholders like
+  {metadata_block} and {photo_list_block} that get filled in dynamically by
+  prompt_builder.py at runtime. Keep anything that changes per analysis here,
+  never in SYSTEM_PROMPT, or every call becomes a cache miss.
+
+The JSON key lists in the output format section come from COLUMN_SCHEMA in
+config.py, so adding or renaming a column only needs a change there (plus
+its row in the column table below).
 """
 
-SYSTEM_PROMPT = """You are an expert retail shelf analyst. You will receive:
+from config import METADATA_COLUMN_KEYS, SKU_KEYS
+
+ROLE_PROMPT = """You are an expert retail shelf analyst. You will receive:
 1. One or more photos of a supermarket shelf (juice/smoothie section)
 2. Metadata about the store (Country, City, Retailer, Store Format)
 3. Optionally: a transcript (text file) describing what is visible on the shelf
 
 Your job: Extract every unique SKU visible in the photos and return structured data in JSON format following the exact schema below."""
 
-ANALYSIS_PROMPT = """
-## STORE METADATA (provided by the user)
-{metadata_block}
-
-## PHOTO LIST AND GROUPING
-{photo_list_block}
-
-{transcript_block}
-
----
-
-STEP 1: ANALYZE PHOTOS
+# Static instructions. Not passed through str.format, so JSON braces are
+# written as-is; {sku_keys} and {metadata_keys} are filled once at import
+# from config.py, so the key list can't drift from the Excel columns
+ANALYSIS_INSTRUCTIONS = """STEP 1: ANALYZE PHOTOS
 
 Photos are the primary source — every data point you extract must be visually verifiable in the photos.
 
 Overview vs. close-up photos: The photo set will always include one or more overview shots of the entire shelf plus close-up photos of specific sections. Overview photos: Use these to understand the full shelf layout, count total SKUs, and prevent duplicate entries. Overview photos are your reference for what exists on the shelf. Close-up photos: Use these to extract detailed SKU data (brand, flavor, claims, price, ml). Close-ups provide the clearest view of labels and price tags.
 
-Critical rule — each SKU is recorded only ONCE: A single SKU may appear in multiple photos (e.g., in an overview AND a close-up, or at the edge of two adjacent close-ups). Always record each unique SKU only once. Record it under the photo where it is most clearly visible — typically a close-up photo. Use the overview photo(s) to verify you haven't counted the same SKU twice. Look for: price labels, brand logos, flavor descriptions, volume/ml markings, claims text, and packaging type.
+Critical rule — each SKU is recorded only ONCE: A single SKU may appear in multiple photos (e.g., in an overview AND a close-up, at the edge of two adjacent close-ups, or in overviews taken from different angles). Map each close-up photo to its position within the overview (e.g., "Close-up 4a covers the right third of overview photo 4"), then record each unique SKU only once, under the photo where it is most clearly visible — typically a close-up where the label and price tag are readable. You may add "Also visible in photo X" in the Notes column, but do NOT create a second row. Facings are the total for that SKU on the shelf as seen in the overview photo — do not sum facings from multiple close-ups. Look for: price labels, brand logos, flavor descriptions, volume/ml markings, claims text, and packaging type.
 
 Use price tags to validate SKU data: The shelf price tag (usually below the product) often contains structured product information including brand, product name, and volume. Cross-reference this with the product label to ensure accuracy.
 
@@ -50,7 +50,7 @@ Read the full transcript and identify references to what I describe seeing. I do
 
 STEP 3: DATA EXTRACTION PER SKU
 
-Process photos ONE AT A TIME in strict sequence: List all photo file names you received at the start (e.g., foto_1.jpg, foto_2.jpg, foto_4.jpg, foto_4a.jpg, foto_4b.jpg, foto_4c.jpg). Start with the first photo in your list. Extract ALL SKUs visible in that photo before moving to the next photo. For EVERY row from that photo, enter the EXACT file name in the "Photo" column — copy the file name precisely, do not paraphrase or shorten it. Complete all SKUs from photo 1, then move to photo 2. Repeat until all photos are processed. Then do deduplication: Use overview photos to identify and remove any duplicate SKUs that appeared in multiple close-ups (keep the entry from the clearest photo). Critical: The Photo column in each Excel row must exactly match the file name of the photo you extracted that SKU from. Do not mix file names across SKUs from different photos. Reminder: Record each unique SKU only ONCE. After processing all photos sequentially, use overview photos to check for duplicates. If an SKU appeared in multiple photos, keep only the entry from the photo where it was clearest and delete the duplicate rows.
+Process photos one at a time, in the order of the photo list: extract ALL SKUs visible in a photo before moving to the next. For every row, set the Photo column to the EXACT file name of the photo you extracted that SKU from — copy it precisely; do not paraphrase, shorten, or mix up file names between photos. After all photos are processed, use the overview photos to remove duplicate SKUs that appeared in multiple photos, keeping only the entry from the photo where the SKU is clearest.
 
 For every unique SKU visible in the photos, capture the following fields in this exact order:
 
@@ -79,7 +79,7 @@ Column | Source | Description
 22 Need State | AI assessment based on label + ingredients | Within Pure Juices and Smoothies, classify as: Indulgence (consumed primarily for taste) or Functional (has health benefit: e.g., added vitamins, protein, fiber, chia, probiotics, superfoods, etc.). Shots are almost always Functional. Base this on visible label claims, health-focused messaging, and special ingredients mentioned. If unclear, default to Indulgence.
 23 Juice Extraction Method | Transcript + label | How the juice was extracted. Use ONLY one of these values: Cold Pressed / Squeezed / From Concentrate / NA/Centrifugal. "Cold Pressed" = juice extracted using hydraulic press or slow press methods (often stated on label). "Squeezed" = juice extracted by squeezing (e.g., freshly squeezed citrus, or label says "squeezed"/"geperst"). "From Concentrate" = reconstituted from concentrate (label says "from concentrate" or "made from concentrate"). "NA/Centrifugal" = default for all other juices where extraction method is not specified, or where standard centrifugal extraction is used (this covers NFC/direct juice and any product where the method is not explicitly stated). If you cannot determine the extraction method from label or transcript, use "NA/Centrifugal". ⚡
 24 Processing Method | Transcript + label | How the juice is preserved. Use ONLY one of these values: HPP / Pasteurised / Raw. "HPP" = High Pressure Processing (often mentioned on label or in transcript). "Pasteurised" = heat-treated / flash-pasteurised / thermally processed. "Raw" = no processing applied, sold as raw/unpasteurised. If you cannot determine the processing method from label or transcript, use "Pasteurised" as the default (since the vast majority of commercially sold juices are pasteurised). Use British spelling: "Pasteurised" not "Pasteurized".
-25 HPP Treatment | Transcript + label | Yes / No / Unknown. HPP (High Pressure Processing) is often mentioned on label or in transcript.
+25 HPP Treatment | Transcript + label | Yes / No / Unknown. HPP (High Pressure Processing) is often mentioned on label or in transcript. If you cannot determine from label or transcript, use "Unknown".
 26 Packaging Type | Visual | PET bottle / Glass bottle / Tetra Pak / Can / Pouch / Cup ⚡
 27 Claims | Visual (label) | Any claims visible on the packaging: e.g., "100% juice", "No added sugar", "Protein 20g", "Vitamins", "Organic", "Vegan", "Superfood", "Energy", "Kids", "Immunity", "Probiotics", "Fiber". Comma-separated. Leave blank if none visible.
 28 Bonus/Promotions | Visual (shelf label/sticker) | Record any promotional activity visible: e.g., "25% korting", "1+1 gratis", "2 voor €5", "2e halve prijs". Free text. Leave blank if no promotion.
@@ -105,13 +105,7 @@ Rule: If the product has NO separate ingredient description below the marketing
 
 STEP 4: QUALITY CHECKS
 
-Deduplication Check (Critical)
-
-Each unique SKU must appear only ONCE in the output — even if it is visible in multiple photos. Why duplicates happen: The same SKU often appears in multiple photos: In both an overview photo AND a close-up photo. At the edge of two adjacent close-up photos. In multiple overview photos taken from different angles. How to prevent duplicates: Start with the overview photo(s) to understand the full shelf layout and identify all unique SKUs present. Map each close-up photo to its position within the overview (e.g., "Close-up 4a covers the right third of overview photo 4"). For each unique SKU, determine which photo shows it most clearly — this is typically a close-up photo where the label and price tag are readable. Record the SKU only once, under the photo where it is clearest. Use the "Photo" column to indicate which photo you extracted the data from. In the Notes column, you may add "Also visible in photo X" for traceability, but do NOT create a second row. Use close-ups for data extraction, overviews for validation: Extract detailed SKU information (brand, flavor, claims, price, ml) from close-up photos where labels are clearest. Use overview photos to cross-check that you haven't missed any SKUs and haven't counted any SKU twice. Facings count: The facings count should reflect the total number of facings for that SKU on the shelf — as seen in the overview photo. Do not sum facings from multiple close-ups.
-
-General Quality Checks
-
-Double-check each SKU against both label AND price tag: For every SKU entry, validate the data by cross-referencing two sources: Product label (on the bottle/pack itself): Brand logo, flavor name, volume, claims. Price tag (shelf label below the product): Often contains structured product info including brand name, product name, and volume in ml. Use both sources to confirm: (a) the brand is correct, (b) the flavor/product name is accurate, and (c) the packaging size matches. If there is a discrepancy between label and price tag, note it in the Notes column and use the most reliable source. Photos are the primary source: Only include data that is clearly visible in the photos. Minimum confidence for inclusion = 60%. Uncertainties: If something is not clearly visible due to photo angle, shadow, reflection, or distance — assign a lower confidence score and note the issue. Transcript conflicts: If the transcript says something different from what the photo shows → the photo wins. Note the conflict in the Notes column. Missing information: Leave the field blank or use the appropriate default value. Do not guess or fabricate data. ⚡ Juice Extraction Method: If you cannot determine from label or transcript, default to "NA/Centrifugal". ⚡ Processing Method: If you cannot determine from label or transcript, default to "Pasteurised". Use British spelling: "Pasteurised" not "Pasteurized". HPP Treatment: If you cannot determine from label or transcript, mark as "Unknown". Product Type classification: If a product could fit multiple segments (e.g., a protein smoothie), classify by the primary positioning visible on the label. Use Need State to capture the functional aspect. Need State classification (Indulgence vs. Functional): This is an AI assessment. Look for: Functional indicators: Health claims on label, added vitamins/minerals, protein content, fiber, probiotics, superfoods, "boost", "immunity", "energy", functional ingredients like ginger, turmeric, chia, spirulina. Indulgence indicators: Emphasis on taste, fruit imagery, no health claims, classic flavor combinations, "pure", "100% fruit" without added functional ingredients. When in doubt, default to Indulgence. Price per liter: Calculate as price_eur / (packaging_size_ml / 1000). Set to null if price or ml is unknown. Do not count depth: Only count bottles in the front row. Photo angles may show bottles stacked behind the front row — ignore these. Facings = horizontal count of front-row bottles only.
+Double-check each SKU against both label AND price tag: For every SKU entry, validate the data by cross-referencing two sources: Product label (on the bottle/pack itself): Brand logo, flavor name, volume, claims. Price tag (shelf label below the product): Often contains structured product info including brand name, product name, and volume in ml. Use both sources to confirm: (a) the brand is correct, (b) the flavor/product name is accurate, and (c) the packaging size matches. If there is a discrepancy between label and price tag, note it in the Notes column and use the most reliable source. Photos are the primary source: Only include data that is clearly visible in the photos. Minimum confidence for inclusion = 60%. Uncertainties: If something is not clearly visible due to photo angle, shadow, reflection, or distance — assign a lower confidence score and note the issue. Transcript conflicts: If the transcript says something different from what the photo shows → the photo wins. Note the conflict in the Notes column. Missing information: Leave the field blank or use the column's default value from the table above (Juice Extraction Method, Processing Method, HPP Treatment). Do not guess or fabricate data. Product Type classification: If a product could fit multiple segments (e.g., a protein smoothie), classify by the primary positioning visible on the label. Use Need State to capture the functional aspect. Need State classification (Indulgence vs. Functional): This is an AI assessment. Look for: Functional indicators: Health claims on label, added vitamins/minerals, protein content, fiber, probiotics, superfoods, "boost", "immunity", "energy", functional ingredients like ginger, turmeric, chia, spirulina. Indulgence indicators: Emphasis on taste, fruit imagery, no health claims, classic flavor combinations, "pure", "100% fruit" without added functional ingredients. When in doubt, default to Indulgence. Price per liter: Calculate as price_eur / (packaging_size_ml / 1000). Set to null if price or ml is unknown.
 
 OUTPUT FORMAT — CRITICAL
 
@@ -119,7 +113,7 @@ Your ENTIRE response must be a single valid JSON array. No markdown, no tables,
 
 Each element is one SKU object. Use EXACTLY these keys (snake_case):
 
-"photo", "shelf_levels", "shelf_level", "product_type", "branded_private_label", "brand", "sub_brand", "product_name", "flavor", "facings", "price_local", "currency", "price_eur", "packaging_size_ml", "price_per_liter_eur", "need_state", "juice_extraction_method", "processing_method", "hpp_treatment", "packaging_type", "claims", "bonus_promotions", "stock_status", "est_linear_meters", "fridge_number", "confidence_score", "notes"
+{sku_keys}
 
 Data type rules:
 - "shelf_levels" and "facings": integers (e.g., 6, 3)
@@ -128,12 +122,35 @@ Data type rules:
 - "confidence_score": integer from 0 to 100 (e.g., 90, 75, 60) — NOT a string like "90%"
 - All other fields: strings (use "" for empty/unknown values)
 
-You do NOT need to include "country", "city", "retailer", "store_format", "store_name", "shelf_location", or "currency" — these are filled in automatically from user metadata.
+Do NOT include these keys — they are filled in automatically from user metadata: {metadata_keys}
 
-Group SKUs by photo (all SKUs from photo 1, then photo 2, etc.). Each unique SKU appears only ONCE.
+Group SKUs by photo (all SKUs from photo 1, then photo 2, etc.).
 
-Example (2 SKUs):
-[{{"photo": "foto_1.jpg", "shelf_levels": 6, "shelf_level": "1st", "product_type": "Pure Juices", "branded_private_label": "Private Label", "brand": "The Juice Company", "sub_brand": "", "product_name": "Orange Juice Smooth", "flavor": "Orange", "facings": 3, "price_local": 1.75, "currency": "GBP", "price_eur": null, "packaging_size_ml": 1000, "price_per_liter_eur": null, "need_state": "Indulgence", "juice_extraction_method": "Squeezed", "processing_method": "Pasteurised", "hpp_treatment": "Unknown", "packaging_type": "PET bottle", "claims": "Not From Concentrate", "bonus_promotions": "", "stock_status": "In Stock", "est_linear_meters": null, "fridge_number": "", "confidence_score": 90, "notes": ""}}, {{"photo": "foto_1.jpg", "shelf_levels": 6, "shelf_level": "2nd", "product_type": "Smoothies", "branded_private_label": "Branded", "brand": "Innocent", "sub_brand": "", "product_name": "Strawberry & Banana", "flavor": "Strawberry & Banana", "facings": 2, "price_local": 2.99, "currency": "GBP", "price_eur": null, "packaging_size_ml": 750, "price_per_liter_eur": null, "need_state": "Indulgence", "juice_extraction_method": "NA/Centrifugal", "processing_method": "Pasteurised", "hpp_treatment": "Unknown", "packaging_type": "PET bottle", "claims": "", "bonus_promotions": "", "stock_status": "In Stock", "est_linear_meters": null, "fridge_number": "", "confidence_score": 85, "notes": ""}}]
+Example (1 SKU):
+[{"photo": "foto_1.jpg", "shelf_levels": 6, "shelf_level": "1st", "product_type": "Pure Juices", "branded_private_label": "Private Label", "brand": "The Juice Company", "sub_brand": "", "product_name": "Orange Juice Smooth", "flavor": "Orange", "facings": 3, "price_local": 1.75, "price_eur": null, "packaging_size_ml": 1000, "price_per_liter_eur": null, "need_state": "Indulgence", "juice_extraction_method": "Squeezed", "processing_method": "Pasteurised", "hpp_treatment": "Unknown", "packaging_type": "PET bottle", "claims": "Not From Concentrate", "bonus_promotions": "", "stock_status": "In Stock", "est_linear_meters": null, "fridge_number": "", "confidence_score": 90, "notes": ""}]
 
 REMEMBER: Output ONLY the JSON array. Do not wrap it in markdown code fences. Do not add any text before or after the JSON.
-"""
\ No newline at end of file
+""".replace(
+    "{sku_keys}", ", ".join(f'"{key}"' for key in SKU_KEYS)
+).replace(
+    "{metadata_keys}", ", ".join(f'"{key}"' for key in METADATA_COLUMN_KEYS)
+)
+
+# Sent as the system prompt (with a prompt cache breakpoint) on every call
+SYSTEM_PROMPT = f"{ROLE_PROMPT}\n\n{ANALYSIS_INSTRUCTIONS}"
+
+# Per-analysis part, sent after the photos in the user message
+ANALYSIS_PROMPT = """
+## STORE METADATA (provided by the user)
+{metadata_block}
+
+## PHOTO LIST AND GROUPING
+{photo_list_block}
+
+## TRANSCRIPT
+{transcript_block}
+
+---
+
+Analyze the photos above following the instructions in the system prompt. Return ONLY the JSON array.
+"""